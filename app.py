@@ -2,7 +2,8 @@
 
 import os
 from flask import Flask, render_template, request
-from planner_ai import generate_style_with_ai, draw_planner_collection
+from planner_ai import generate_style_with_ai, draw_planner_collections
+from profiling import PROFILE_HEADER, header_allows_profile, profile_request
 
 app = Flask(__name__)
 
@@ -20,12 +21,17 @@ def index():
 def generate():
     user_prompt = request.form.get("prompt", "").strip()
 
-    # 1) AI ile stil üret
-    style = generate_style_with_ai(user_prompt)
-
-    # 2) A4 ve US Letter için bundle (çok sayfalı PDF + preview PNG) oluştur
-    a4_files = draw_planner_collection(style, "a4", GENERATED_DIR)
-    us_files = draw_planner_collection(style, "us_letter", GENERATED_DIR)
+    # Opt-in profil (env, örnekleme oranı ya da izin verilmişse X-Planner-Profile header'ı)
+    force_profile = header_allows_profile(request.headers.get(PROFILE_HEADER))
+    with profile_request("generate", force=force_profile) as profile:
+        # 1) AI ile stil üret
+        style = generate_style_with_ai(user_prompt)
+        profile.style = style
+
+        # 2) A4 ve US Letter için bundle (çok sayfalı PDF + preview PNG) tek seferde oluştur
+        bundles = draw_planner_collections(style, ["a4", "us_letter"], GENERATED_DIR)
+    a4_files = bundles["a4"]
+    us_files = bundles["us_letter"]
 
     # 3) Sonuç sayfasına gönder
     return render_template(
@@ -0,0 +1,57 @@
+# gunicorn.conf.py
+#
+# gunicorn bu dosyayı çalışma klasöründen otomatik okur: `gunicorn app:app`
+#
+#   PLANNER_PRELOAD=0  -> preload_app kapalı (her worker app'i kendisi import eder)
+#   PLANNER_WARMUP=0   -> warm-up render'ı kapalı
+
+import gc
+import os
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+preload_app = os.environ.get("PLANNER_PRELOAD", "1").strip().lower() in _TRUTHY
+WARMUP = os.environ.get("PLANNER_WARMUP", "1").strip().lower() in _TRUTHY
+
+# Preload'da GC master'da app importundan önce kapatılır: fork'a kadar toplama
+# olmaz, dondurulan heap'te boşluk kalmaz. Worker'larda post_worker_init açar.
+if preload_app:
+    gc.disable()
+
+
+def on_starting(server):
+    # preload_app açıkken app master'da import edildi: cache'leri burada ısıt,
+    # fork sonrası worker'lar bunları copy-on-write ile paylaşsın.
+    if not preload_app:
+        return
+
+    if WARMUP:
+        import openai  # noqa: F401  (sadece modül; client her worker'da ayrı oluşur)
+
+        from planner_ai import warm_up
+
+        warm_up()
+
+    # Import ve warm-up'tan kalan döngüsel çöpü topla, sonra kalanları GC takibinden
+    # çıkar; aksi halde worker'lardaki GC taramaları refcount/GC header'larına
+    # yazıp paylaşılan sayfaları kopyalatır.
+    gc.collect()
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # preload_app açıkken cache'ler master'da ısındı ve fork ile paylaşılıyor;
+    # burada tekrar çizmek sadece boot'u yavaşlatır ve paylaşılan sayfaları
+    # kopyalatır. Worker'a özel olan tek şey OpenAI client'ı.
+    # Preload yoksa ilk isteğin soğuk maliyetini tek bir atılacak sayfayla öde.
+    from planner_ai import get_openai_client, warm_up
+
+    if preload_app:
+        gc.enable()
+    elif WARMUP:
+        warm_up(("a4",), all_pages=False)
+
+    try:
+        get_openai_client()
+    except Exception as e:
+        print("OpenAI client warm-up failed:", e)
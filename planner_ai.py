@@ -1,14 +1,28 @@
 # planner_ai.py
 
+import io
 import os
 import json
+import math
 import uuid
-from typing import Dict, List
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
 from PIL import Image, ImageDraw, ImageFont
-from openai import OpenAI
 
-client = OpenAI()  # OPENAI_API_KEY ortam değişkeninden okunur
+from profiling import profile_request
+
+
+@lru_cache(maxsize=1)
+def get_openai_client():
+    """
+    OpenAI client'ı ilk kullanımda oluşturur (OPENAI_API_KEY ortam değişkeninden okunur).
+    SDK importu da buraya ertelenir: modül importu hızlı kalır ve gunicorn preload'da
+    client (ve HTTP bağlantı havuzu) fork'tan önce değil, her worker'da ayrı oluşur.
+    """
+    from openai import OpenAI
+
+    return OpenAI()
 
 
 # --- AI TARAFI -------------------------------------------------------------
@@ -83,7 +97,7 @@ Rules:
     user_content = f"User style prompt: {user_prompt or 'Surprise me with a unique planner bundle style with fun decorations.'}"
 
     try:
-        response = client.chat.completions.create(
+        response = get_openai_client().chat.completions.create(
             model="gpt-4o-mini",
             temperature=0.95,
             messages=[
@@ -112,6 +126,59 @@ Rules:
 # --- ORTAK YARDIMCI FONKSİYONLAR ------------------------------------------
 
 
+# Kağıt boyutu registry'si. Boyutlar fiziksel birimle tutulur, piksel ölçüsü
+# DPI'a göre hesaplanır. margin: sayfa genişliği/yüksekliğine oranla kenar boşluğu.
+PAPER_SIZES: Dict[str, Dict] = {}
+
+_UNIT_TO_INCH = {
+    "in": 1.0,
+    "mm": 1 / 25.4,
+}
+
+
+def register_paper_size(name: str, width: float, height: float, unit: str = "mm",
+                        dpi: int = 300, margin: float = 0.06, label: str = None) -> Dict:
+    """
+    Yeni bir kağıt boyutu ekler (ya da aynı isimliyi günceller).
+    unit: "mm", "in" veya "px" (px için fiziksel boyut dpi'dan türetilir).
+    """
+    if unit == "px":
+        width_px, height_px = int(width), int(height)
+    elif unit in _UNIT_TO_INCH:
+        width_px = round(width * _UNIT_TO_INCH[unit] * dpi)
+        height_px = round(height * _UNIT_TO_INCH[unit] * dpi)
+    else:
+        raise ValueError(f"Unknown paper size unit: {unit}")
+
+    PAPER_SIZES[name] = {
+        "label": label or name,
+        "width": width_px,
+        "height": height_px,
+        "dpi": dpi,
+        "margin_x": int(width_px * margin),
+        "margin_y": int(height_px * margin),
+    }
+    return PAPER_SIZES[name]
+
+
+def get_paper_size(size_name: str) -> Dict:
+    """
+    Registry'den boyutu döndürür. Bilinmeyen isimler US Letter'a düşer.
+    """
+    return PAPER_SIZES.get(size_name, PAPER_SIZES["us_letter"])
+
+
+register_paper_size("a4", 210, 297, "mm", label="A4")
+register_paper_size("us_letter", 8.5, 11, "in", label="US Letter")
+register_paper_size("a5", 148, 210, "mm", label="A5")
+register_paper_size("half_letter", 5.5, 8.5, "in", label="Half Letter")
+register_paper_size("b5", 176, 250, "mm", label="B5")
+# Dijital planner'lar (GoodNotes vb.): tablet ekranı ve düşük DPI'lı A4
+register_paper_size("tablet", 2048, 2732, "px", dpi=264, label="Tablet (GoodNotes)")
+register_paper_size("goodnotes_a4", 210, 297, "mm", dpi=150, label="GoodNotes A4")
+
+
+@lru_cache(maxsize=256)
 def hex_to_rgb(hex_color: str):
     hex_color = hex_color.lstrip("#")
     if len(hex_color) != 6:
@@ -119,9 +186,11 @@ def hex_to_rgb(hex_color: str):
     return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
 
 
+@lru_cache(maxsize=128)
 def load_font(size: int) -> ImageFont.FreeTypeFont:
     """
     Sunucuda her zaman font olmayabilir, bu yüzden try/except ile default'a düş.
+    Aynı piksel boyutu için font bir kez yüklenir (boyutlar arasında paylaşılır).
     """
     try:
         return ImageFont.truetype("arial.ttf", size)
@@ -129,13 +198,14 @@ def load_font(size: int) -> ImageFont.FreeTypeFont:
         return ImageFont.load_default()
 
 
-def get_text_size(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeTypeFont):
-    """
-    Pillow'un farklı sürümleri için güvenli text ölçüm fonksiyonu.
-    Önce textbbox dener, olmazsa font.getsize'a düşer.
-    """
+# Ölçüm için küçük ortak bir çizim yüzeyi; textbbox sonucu hedef sayfadan bağımsız.
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+
+@lru_cache(maxsize=2048)
+def _measure_text(text: str, font: ImageFont.FreeTypeFont):
     try:
-        bbox = draw.textbbox((0, 0), text, font=font)
+        bbox = _MEASURE_DRAW.textbbox((0, 0), text, font=font)
         w = bbox[2] - bbox[0]
         h = bbox[3] - bbox[1]
         return w, h
@@ -146,43 +216,188 @@ def get_text_size(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeType
             return 0, 0
 
 
+def get_text_size(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeTypeFont):
+    """
+    Pillow'un farklı sürümleri için güvenli text ölçüm fonksiyonu.
+    Önce textbbox dener, olmazsa font.getsize'a düşer.
+    Sonuç (text, font) için cache'lenir; font'lar load_font'tan geldiği için
+    aynı ölçekteki boyutlar aynı ölçümü paylaşır.
+    """
+    return _measure_text(text, font)
+
+
 def get_canvas(size_name: str, bg_color) -> (Image.Image, ImageDraw.ImageDraw, int, int, int, int):
     """
-    Belirtilen boyutta boş planner sayfası oluşturur.
+    Belirtilen boyutta (PAPER_SIZES) boş planner sayfası oluşturur.
     """
-    if size_name == "a4":
-        # 210 x 297 mm @ 300 DPI ≈ 2480 x 3508 px
-        width, height = 2480, 3508
-    else:
-        # US Letter 8.5 x 11 in @ 300 DPI ≈ 2550 x 3300 px
-        width, height = 2550, 3300
+    paper = get_paper_size(size_name)
+    width, height = paper["width"], paper["height"]
 
     img = Image.new("RGB", (width, height), bg_color)
     draw = ImageDraw.Draw(img)
 
-    margin_x = int(width * 0.06)
-    margin_y = int(height * 0.06)
+    return img, draw, width, height, paper["margin_x"], paper["margin_y"]
+
+
+# --- DEKORASYON MOTORU ----------------------------------------------------
+
+# Şekiller bir kez supersample edilmiş maskeye çizilir, sonra küçültülür
+# (kenarlar yumuşak olsun diye).
+SPRITE_SUPERSAMPLE = 4
+SPRITE_CACHE_SIZE = 128
+
+
+def _shape_dot(draw: ImageDraw.ImageDraw, s: int):
+    draw.ellipse([0, 0, s - 1, s - 1], fill=255)
+
+
+def _shape_star(draw: ImageDraw.ImageDraw, s: int):
+    c = s / 2
+    outer, inner = s / 2, s / 5
+    points = []
+    for i in range(10):
+        r = outer if i % 2 == 0 else inner
+        a = -math.pi / 2 + i * math.pi / 5
+        points.append((c + r * math.cos(a), c + r * math.sin(a)))
+    draw.polygon(points, fill=255)
+
+
+def _shape_heart(draw: ImageDraw.ImageDraw, s: int):
+    # Klasik parametrik kalp eğrisi, x: [-16, 16], y: [-17, 12]
+    c = s / 2
+    k = s / 34
+    points = []
+    for i in range(72):
+        t = 2 * math.pi * i / 72
+        x = 16 * math.sin(t) ** 3
+        y = 13 * math.cos(t) - 5 * math.cos(2 * t) - 2 * math.cos(3 * t) - math.cos(4 * t)
+        points.append((c + x * k, c - (y + 2.5) * k))
+    draw.polygon(points, fill=255)
+
+
+def _shape_leaf(draw: ImageDraw.ImageDraw, s: int):
+    # Köşegen boyunca uzanan mercek şeklinde yaprak + ortada damar
+    half = s / 2
+    points = []
+    for i in range(41):
+        u = i / 40
+        points.append((u, 0.32 * math.sin(math.pi * u)))
+    for i in range(40, -1, -1):
+        u = i / 40
+        points.append((u, -0.32 * math.sin(math.pi * u)))
+
+    def to_canvas(u, v):
+        # (u, v) -> 45 derece döndürülmüş piksel koordinatı
+        x = (u - 0.5) * s * 1.3
+        y = v * s
+        return (half + (x - y) * 0.7071, half - (x + y) * 0.7071)
+
+    draw.polygon([to_canvas(u, v) for u, v in points], fill=255)
+    draw.line([to_canvas(0.08, 0), to_canvas(0.85, 0)], fill=0, width=max(1, s // 24))
+
+
+def _shape_blob(draw: ImageDraw.ImageDraw, s: int):
+    c = s / 2
+    points = []
+    for i in range(90):
+        a = 2 * math.pi * i / 90
+        r = 1 + 0.14 * math.sin(3 * a) + 0.08 * math.cos(5 * a + 1)
+        points.append((c + r * s * 0.42 * math.cos(a), c + r * s * 0.42 * math.sin(a)))
+    draw.polygon(points, fill=255)
+
+
+DECORATION_SHAPES = {
+    "dot": _shape_dot,
+    "star": _shape_star,
+    "heart": _shape_heart,
+    "leaf": _shape_leaf,
+    "blob": _shape_blob,
+}
 
-    return img, draw, width, height, margin_x, margin_y
+# AI'ın döndürdüğü serbest kelimeleri şekillere eşler (alt string araması)
+DECORATION_KEYWORDS = [
+    ("star", "star"),
+    ("sparkle", "star"),
+    ("heart", "heart"),
+    ("love", "heart"),
+    ("leaf", "leaf"),
+    ("leaves", "leaf"),
+    ("plant", "leaf"),
+    ("botanic", "leaf"),
+    ("flor", "leaf"),
+    ("flower", "leaf"),
+    ("dot", "dot"),
+    ("circle", "dot"),
+    ("polka", "dot"),
+    ("abstract", "blob"),
+    ("blob", "blob"),
+    ("shape", "blob"),
+    ("cloud", "blob"),
+]
+
+# Sayfa üzerindeki yerleşim: (x oranı, y oranı, boyut çarpanı, renk indeksi)
+DECORATION_SLOTS = [
+    (0.12, 0.10, 1.0, 0),
+    (0.88, 0.18, 1.0, 1),
+    (0.16, 0.85, 1.0, 1),
+    (0.84, 0.80, 1.0, 0),
+    (0.17, 0.08, 0.5, 1),
+    (0.93, 0.14, 0.5, 0),
+    (0.11, 0.89, 0.5, 0),
+    (0.89, 0.84, 0.5, 1),
+]
+
+
+def resolve_decoration_shapes(decorations) -> List[str]:
+    """
+    Dekorasyon kelimelerini (örn. "cute stars", "plants") şekil isimlerine çevirir.
+    Tanınmayan kelimeler atlanır; hiçbiri tanınmazsa ["dot"] döner.
+    """
+    shapes: List[str] = []
+    for word in decorations or []:
+        if not isinstance(word, str):
+            continue
+        word = word.lower()
+        for keyword, shape in DECORATION_KEYWORDS:
+            if keyword in word:
+                if shape not in shapes:
+                    shapes.append(shape)
+                break
+    return shapes or ["dot"]
+
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def get_decoration_sprite(shape: str, size: int, color: Tuple[int, int, int]) -> Image.Image:
+    """
+    (şekil, boyut, renk) için RGBA sprite üretir ve LRU cache'te tutar.
+    Aynı stil her sayfada ve her bundle'da tekrar rasterize edilmez.
+    """
+    big = size * SPRITE_SUPERSAMPLE
+    mask = Image.new("L", (big, big), 0)
+    DECORATION_SHAPES.get(shape, _shape_dot)(ImageDraw.Draw(mask), big)
+    mask = mask.resize((size, size), Image.LANCZOS)
+
+    sprite = Image.new("RGBA", (size, size), tuple(color) + (0,))
+    sprite.putalpha(mask)
+    return sprite
 
 
-def draw_decorations(draw, width, height, decorations, accent_color, accent_color_2):
+def draw_decorations(img: Image.Image, width, height, decorations, accent_color, accent_color_2):
     """
-    Basit doodle tarzı süslemeler (daire, yıldız, nokta vb).
+    Doodle tarzı süslemeler (yıldız, kalp, yaprak, nokta, soyut şekil).
+    Şekiller cache'lenmiş sprite'lar olarak sayfaya alpha-composite edilir.
     """
-    if not decorations:
-        decorations = ["dots"]
+    shapes = resolve_decoration_shapes(decorations)
+    colors = (tuple(accent_color), tuple(accent_color_2))
 
-    # köşelerde birkaç basit şekil
-    r = int(min(width, height) * 0.02)
+    base = int(min(width, height) * 0.04)
 
-    def circle(cx, cy, color):
-        draw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=color, outline=None)
-
-    circle(int(width * 0.12), int(height * 0.10), accent_color)
-    circle(int(width * 0.88), int(height * 0.18), accent_color_2)
-    circle(int(width * 0.16), int(height * 0.85), accent_color_2)
-    circle(int(width * 0.84), int(height * 0.80), accent_color)
+    for i, (fx, fy, scale, color_idx) in enumerate(DECORATION_SLOTS):
+        size = max(2, int(base * scale))
+        sprite = get_decoration_sprite(shapes[i % len(shapes)], size, colors[color_idx])
+        x = int(width * fx) - size // 2
+        y = int(height * fy) - size // 2
+        img.paste(sprite, (x, y), sprite)
 
 
 # --- SAYFA ÇİZİMLERİ ------------------------------------------------------
@@ -247,7 +462,7 @@ def draw_cover_page(style: Dict, size_name: str) -> Image.Image:
     draw.text((f_x, f_y), footer_text, fill=text_color, font=footer_font)
 
     # Dekorasyonlar
-    draw_decorations(draw, width, height, style.get("decorations"), accent, accent2)
+    draw_decorations(img, width, height, style.get("decorations"), accent, accent2)
 
     return img
 
@@ -367,7 +582,7 @@ def draw_daily_page(style: Dict, size_name: str) -> Image.Image:
                     y = line_top + j * spacing
                     draw.line([left + line_margin, y, right - line_margin, y], fill=(200, 200, 200), width=2)
 
-    draw_decorations(draw, width, height, style.get("decorations"), accent, accent2)
+    draw_decorations(img, width, height, style.get("decorations"), accent, accent2)
     return img
 
 
@@ -442,7 +657,7 @@ def draw_weekly_page(style: Dict, size_name: str) -> Image.Image:
                     width=2,
                 )
 
-    draw_decorations(draw, width, height, style.get("decorations"), accent, accent2)
+    draw_decorations(img, width, height, style.get("decorations"), accent, accent2)
     return img
 
 
@@ -530,7 +745,7 @@ def draw_monthly_page(style: Dict, size_name: str) -> Image.Image:
                 draw.line([right_left + line_margin, y, right_left + right_width - line_margin, y],
                           fill=(200, 200, 200), width=2)
 
-    draw_decorations(draw, width, height, style.get("decorations"), accent, accent2)
+    draw_decorations(img, width, height, style.get("decorations"), accent, accent2)
     return img
 
 
@@ -599,7 +814,7 @@ def draw_yearly_page(style: Dict, size_name: str) -> Image.Image:
 
             idx += 1
 
-    draw_decorations(draw, width, height, style.get("decorations"), accent, accent2)
+    draw_decorations(img, width, height, style.get("decorations"), accent, accent2)
     return img
 
 
@@ -637,13 +852,23 @@ def draw_notes_page(style: Dict, size_name: str) -> Image.Image:
         draw.line([margin_x, y, width - margin_x, y], fill=(210, 210, 210), width=1)
 
     # Hafif doodle
-    draw_decorations(draw, width, height, style.get("decorations"), accent, accent2)
+    draw_decorations(img, width, height, style.get("decorations"), accent, accent2)
     return img
 
 
 # --- BÜTÜN BUNDLE'I OLUŞTURAN FONKSİYON -----------------------------------
 
 
+PAGE_RENDERERS = [
+    draw_cover_page,
+    draw_daily_page,
+    draw_weekly_page,
+    draw_monthly_page,
+    draw_yearly_page,
+    draw_notes_page,
+]
+
+
 def draw_planner_collection(style: Dict, size_name: str, output_dir: str) -> Dict[str, str]:
     """
     Tek bir stil için:
@@ -662,29 +887,86 @@ def draw_planner_collection(style: Dict, size_name: str, output_dir: str) -> Dic
       {"pdf": "generated/xxx.pdf", "preview": "generated/yyy.png"}
     döndürür.
     """
-    os.makedirs(output_dir, exist_ok=True)
+    return draw_planner_collections(style, [size_name], output_dir)[size_name]
 
-    pages: List[Image.Image] = []
-    pages.append(draw_cover_page(style, size_name))
-    pages.append(draw_daily_page(style, size_name))
-    pages.append(draw_weekly_page(style, size_name))
-    pages.append(draw_monthly_page(style, size_name))
-    pages.append(draw_yearly_page(style, size_name))
-    pages.append(draw_notes_page(style, size_name))
 
-    bundle_id = uuid.uuid4().hex
+def draw_planner_collections(style: Dict, size_names: List[str], output_dir: str) -> Dict[str, Dict[str, str]]:
+    """
+    Aynı stil için birden fazla kağıt boyutunu tek seferde üretir.
+
+    Renk çözümleme, font yükleme ve metin ölçümü cache'lidir; font boyutları
+    sayfa yüksekliğinden türediği için paylaşım sadece piksel ölçeği aynı olan
+    boyutlar arasında olur (kayıtlı boyutların hepsi farklı ölçektedir).
+    Sayfalar her boyut için ayrı çizilir; sadece aynı piksel geometrisine düşen
+    isimler (örn. US Letter'a düşen bilinmeyen isimler) çizilmiş sayfaları
+    ortak kullanır.
+    PLANNER_PROFILE ortam değişkenleriyle profillenebilir (bkz. profiling.py).
 
-    # PNG preview (cover)
-    preview_filename = f"planner_{size_name}_{bundle_id}_preview.png"
-    preview_full = os.path.join(output_dir, preview_filename)
-    pages[0].save(preview_full, format="PNG")
+    Geriye:
+      {"a4": {"pdf": ..., "preview": ...}, "us_letter": {...}, ...}
+    döndürür.
+    """
+    with profile_request("draw_planner_collections", style=style):
+        return _draw_planner_collections(style, size_names, output_dir)
 
-    # PDF (çok sayfalı)
-    pdf_filename = f"planner_{size_name}_{bundle_id}.pdf"
-    pdf_full = os.path.join(output_dir, pdf_filename)
-    pages[0].save(pdf_full, format="PDF", save_all=True, append_images=pages[1:], resolution=300)
 
-    return {
-        "preview": f"generated/{preview_filename}",
-        "pdf": f"generated/{pdf_filename}",
-    }
+def _page_geometry(paper: Dict) -> tuple:
+    return (paper["width"], paper["height"], paper["margin_x"], paper["margin_y"])
+
+
+def _draw_planner_collections(style: Dict, size_names: List[str], output_dir: str) -> Dict[str, Dict[str, str]]:
+    os.makedirs(output_dir, exist_ok=True)
+
+    bundle_id = uuid.uuid4().hex
+    rendered: Dict[tuple, List[Image.Image]] = {}
+    results: Dict[str, Dict[str, str]] = {}
+
+    # Sayfa çizimi sadece bu değerlere bağlı (fontlar da yükseklikten türer);
+    # aynı anahtara düşen isimler çizilmiş sayfaları ortak kullanır.
+    geometries = [_page_geometry(get_paper_size(size_name)) for size_name in size_names]
+
+    for i, size_name in enumerate(size_names):
+        if size_name in results:
+            continue
+
+        paper = get_paper_size(size_name)
+        geometry = geometries[i]
+        if geometry not in rendered:
+            rendered[geometry] = [render(style, size_name) for render in PAGE_RENDERERS]
+        pages = rendered[geometry]
+        # Sonraki isimlerden hiçbiri bu geometriye düşmüyorsa sayfalar kaydedildikten
+        # sonra bırakılır; bellekte aynı anda tek boyutun sayfaları kalır.
+        if geometry not in geometries[i + 1:]:
+            del rendered[geometry]
+
+        # PNG preview (cover)
+        preview_filename = f"planner_{size_name}_{bundle_id}_preview.png"
+        preview_full = os.path.join(output_dir, preview_filename)
+        pages[0].save(preview_full, format="PNG", dpi=(paper["dpi"], paper["dpi"]))
+
+        # PDF (çok sayfalı)
+        pdf_filename = f"planner_{size_name}_{bundle_id}.pdf"
+        pdf_full = os.path.join(output_dir, pdf_filename)
+        pages[0].save(pdf_full, format="PDF", save_all=True, append_images=pages[1:], resolution=paper["dpi"])
+
+        results[size_name] = {
+            "preview": f"generated/{preview_filename}",
+            "pdf": f"generated/{pdf_filename}",
+        }
+
+    return results
+
+
+def warm_up(size_names: Tuple[str, ...] = ("a4", "us_letter"), all_pages: bool = True):
+    """
+    Worker trafiğe açılmadan önce atılacak sayfaları çizer:
+    font/ölçüm/sprite cache'lerini doldurur ve Pillow'un PNG/PDF
+    encoder'larını yükler. Hiçbir dosya yazılmaz.
+    all_pages=False ise her boyut için sadece cover sayfası çizilir.
+    """
+    style = DEFAULT_STYLE.copy()
+    renderers = PAGE_RENDERERS if all_pages else PAGE_RENDERERS[:1]
+    for size_name in size_names:
+        pages = [render(style, size_name) for render in renderers]
+        pages[0].save(io.BytesIO(), format="PNG")
+        pages[0].save(io.BytesIO(), format="PDF", save_all=True, append_images=pages[1:2])
@@ -0,0 +1,252 @@
+# profiling.py
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Profil modu tamamen opt-in:
+#   PLANNER_PROFILE=1                  -> her istek/çağrı profillenir
+#   PLANNER_PROFILE_SAMPLE_RATE=0.05   -> isteklerin ~%5'i profillenir
+#   PLANNER_PROFILE_ALLOW_HEADER=1     -> "X-Planner-Profile: 1" header'ı kabul edilir
+#   PLANNER_PROFILE_DIR=...            -> çıktı klasörü (varsayılan: ./profiles)
+#   PLANNER_PROFILE_INTERVAL_MS=5      -> örnekleme aralığı
+PROFILE_ENV = "PLANNER_PROFILE"
+PROFILE_SAMPLE_RATE_ENV = "PLANNER_PROFILE_SAMPLE_RATE"
+PROFILE_ALLOW_HEADER_ENV = "PLANNER_PROFILE_ALLOW_HEADER"
+PROFILE_DIR_ENV = "PLANNER_PROFILE_DIR"
+PROFILE_INTERVAL_ENV = "PLANNER_PROFILE_INTERVAL_MS"
+PROFILE_HEADER = "X-Planner-Profile"
+
+DEFAULT_PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+
+_TRUTHY = ("1", "true", "yes", "on")
+
+# İç içe çağrılarda (örn. /generate -> draw_planner_collections) kararı en dıştaki
+# verir: profil açık da olsa kapalı da olsa _active.session dolu kalır, içteki
+# çağrılar örnekleme oranını tekrar çekmez.
+_active = threading.local()
+
+
+def _is_truthy(value) -> bool:
+    return str(value or "").strip().lower() in _TRUTHY
+
+
+def header_allows_profile(header_value: Optional[str]) -> Optional[bool]:
+    """
+    Header sadece PLANNER_PROFILE_ALLOW_HEADER açıksa dikkate alınır,
+    aksi halde dışarıdan herkes disk'e profil yazdırabilirdi.
+    Header profili sadece açabilir (True ya da None); operatörün env ile
+    açtığı profili istemci kapatamaz.
+    """
+    if not _is_truthy(os.environ.get(PROFILE_ALLOW_HEADER_ENV)):
+        return None
+    return True if _is_truthy(header_value) else None
+
+
+def should_profile(force: Optional[bool] = None) -> bool:
+    if force is not None:
+        return force
+    if _is_truthy(os.environ.get(PROFILE_ENV)):
+        return True
+    try:
+        rate = float(os.environ.get(PROFILE_SAMPLE_RATE_ENV, "0") or 0)
+    except ValueError:
+        return False
+    return rate > 0 and random.random() < rate
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    # collapsed formatında ";" ayraç, boşluk da sayıdan önceki ayraç
+    return name.replace(";", ":")
+
+
+class SamplingProfiler:
+    """
+    Belirli bir thread'in stack'ini arka plandaki bir thread'den
+    sabit aralıklarla örnekler (sys._current_frames).
+    Her örnek kök -> yaprak sıralı frame isimleri ve geçen süre olarak tutulur.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: List[Tuple[Tuple[str, ...], float]] = []
+        self.duration = 0.0
+        self._thread_id = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._started_at = 0.0
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="planner-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started_at
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            now = time.perf_counter()
+            weight, last = now - last, now
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append((tuple(stack), weight))
+
+    def collapsed(self) -> str:
+        """
+        flamegraph.pl / speedscope'un okuduğu "a;b;c <değer>" formatı.
+        Değer örnek sayısı değil, stack'te geçen ölçülmüş süre (mikrosaniye);
+        GIL tutulurken geciken örnekler de böylece doğru ağırlığı alır ve
+        speedscope dosyasıyla aynı toplamı verir.
+        """
+        totals: Dict[Tuple[str, ...], float] = {}
+        for stack, weight in self.samples:
+            totals[stack] = totals.get(stack, 0.0) + weight
+        return "".join(
+            f"{';'.join(stack)} {round(total * 1_000_000)}\n" for stack, total in totals.items()
+        )
+
+    def speedscope(self, name: str) -> Dict:
+        frames: List[Dict] = []
+        frame_index: Dict[str, int] = {}
+        samples: List[List[int]] = []
+        weights: List[float] = []
+
+        for stack, weight in self.samples:
+            indices = []
+            for frame_name in stack:
+                if frame_name not in frame_index:
+                    frame_index[frame_name] = len(frames)
+                    frames.append({"name": frame_name})
+                indices.append(frame_index[frame_name])
+            samples.append(indices)
+            weights.append(weight)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "planner-profiling",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+class ProfileSession:
+    """
+    profile_request'in döndürdüğü nesne. Profil kapalıyken de döner (enabled=False),
+    böylece çağıran taraf `session.style = ...` için dallanmak zorunda kalmaz.
+    """
+
+    def __init__(self, label: str, style: Optional[Dict] = None, enabled: bool = False):
+        self.label = label
+        self.style = style
+        self.enabled = enabled
+        self.files: Dict[str, str] = {}
+
+
+def _write_profile(session: ProfileSession, profiler: SamplingProfiler, output_dir: str) -> Dict[str, str]:
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.join(output_dir, f"profile_{session.label}_{uuid.uuid4().hex}")
+
+    files = {
+        "collapsed": base + ".collapsed.txt",
+        "speedscope": base + ".speedscope.json",
+        "style": base + ".style.json",
+    }
+
+    with open(files["collapsed"], "w", encoding="utf-8") as f:
+        f.write(profiler.collapsed())
+
+    with open(files["speedscope"], "w", encoding="utf-8") as f:
+        json.dump(profiler.speedscope(session.label), f)
+
+    with open(files["style"], "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "label": session.label,
+                "duration_seconds": profiler.duration,
+                "sample_count": len(profiler.samples),
+                "interval_seconds": profiler.interval,
+                "style": session.style,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+
+    return files
+
+
+@contextmanager
+def profile_request(label: str, style: Optional[Dict] = None, force: Optional[bool] = None,
+                    output_dir: Optional[str] = None):
+    """
+    Bloğu (opt-in olarak) profiller ve çıkışta collapsed-stack + speedscope
+    dosyalarını, tetikleyen stil ile birlikte yazar.
+
+        with profile_request("generate", force=header_allows_profile(...)) as session:
+            style = ...
+            session.style = style
+    """
+    if getattr(_active, "session", None) is not None:
+        yield ProfileSession(label, style, enabled=False)
+        return
+
+    if not should_profile(force):
+        _active.session = ProfileSession(label, style, enabled=False)
+        try:
+            yield _active.session
+        finally:
+            _active.session = None
+        return
+
+    try:
+        interval = float(os.environ.get(PROFILE_INTERVAL_ENV, "5")) / 1000
+    except ValueError:
+        interval = 0.005
+
+    session = ProfileSession(label, style, enabled=True)
+    profiler = SamplingProfiler(interval=interval)
+    _active.session = session
+    profiler.start()
+    try:
+        yield session
+    finally:
+        profiler.stop()
+        _active.session = None
+        try:
+            session.files = _write_profile(
+                session, profiler, output_dir or os.environ.get(PROFILE_DIR_ENV) or DEFAULT_PROFILE_DIR
+            )
+            print("Profile written:", session.files["speedscope"])
+        except Exception as e:
+            print("Writing profile failed:", e)